@@ -1,27 +1,36 @@
 
+import os
 import secrets
 import base64
-import requests
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from flask_wtf import FlaskForm
 from werkzeug.middleware.proxy_fix import ProxyFix
+from itsdangerous import URLSafeTimedSerializer, BadSignature
 from werkzeug.security import generate_password_hash, check_password_hash
 from wtforms import StringField, PasswordField, SubmitField, SelectField, TextAreaField
 from wtforms.validators import DataRequired, Email, Length, ValidationError, EqualTo
 from config import Config
-from email.mime.text import MIMEText
-from email.utils import formataddr
-import smtplib
+from utils.request_data import RequestDataCodec
+from utils.scheduler import TimerScheduler
+from utils.ratelimit import Bucket, SqliteBucketStore, token_key
+import senders
 import json
-import idna
+import math
 import hmac
-import hashlib
+import sqlite3
+import csv
+import io
+import zlib
+import threading
 import time
-import urllib.parse
 import pytz
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from sqlalchemy import event
 
 # 初始化应用
 app = Flask(__name__)
@@ -30,13 +39,96 @@ db = SQLAlchemy(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
-app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_port=1)
+# 只信任配置层数的反向代理，直接对外时使用连接地址，避免伪造X-Forwarded-For绕过按IP限流
+proxy_count = app.config['TRUSTED_PROXY_COUNT']
+if proxy_count:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_count, x_proto=proxy_count, x_host=proxy_count,
+                            x_port=proxy_count)
 
 @app.cli.command('init-db')
 def init_db():
     """Initialize the database."""
     db.create_all()
     print('Initialized the database.')
+    # 升级后统计表为空而已有日志时自动回填；只查询id列，旧库尚未执行 migrate-request-data 时也能运行
+    if (db.session.query(NotificationStat.id).first() is None
+            and db.session.query(NotificationLog.id).first() is not None):
+        print(f'Rebuilt {rebuild_notification_stats()} statistics buckets.')
+
+
+@app.cli.command('migrate-request-data')
+def migrate_request_data():
+    """Strip tokens from and compress legacy request_data rows in chunks."""
+    columns = [column['name'] for column in db.inspect(db.engine).get_columns('notification_log')]
+    if 'request_preview' not in columns:
+        with db.engine.begin() as connection:
+            connection.execute(db.text('ALTER TABLE notification_log ADD COLUMN request_preview VARCHAR(200)'))
+        print('Added request_preview column.')
+
+    # 新写入的日志都带有预览，预览为空即为待迁移的旧数据
+    table = NotificationLog.__table__
+    last_id = 0
+    migrated = 0
+    while True:
+        rows = db.session.execute(
+            db.select(table.c.id, table.c.request_data).where(
+                table.c.id > last_id,
+                table.c.request_preview.is_(None)
+            ).order_by(table.c.id).limit(500)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            text = RequestDataCodec.decompress(row.request_data)
+            try:
+                text = RequestDataCodec.sanitize(json.loads(text))
+            except ValueError:
+                pass
+            db.session.execute(table.update().where(table.c.id == row.id).values(
+                request_data=RequestDataCodec.compress(text),
+                request_preview=RequestDataCodec.preview(text)
+            ))
+        last_id = rows[-1].id
+        migrated += len(rows)
+        db.session.commit()
+    print(f'Migrated {migrated} log rows.')
+
+
+def rebuild_notification_stats():
+    """在同一事务中从原始日志重算统计表，期间阻塞日志写入，避免并发写入的增量丢失"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        db.session.execute(db.text('LOCK TABLE notification_log IN SHARE MODE'))
+    # SQLite下先删除即取得写锁，其他写入需等待本事务提交
+    NotificationStat.query.delete()
+
+    counts = defaultdict(int)
+    query = db.session.query(
+        NotificationLog.user_id,
+        NotificationLog.channel_id,
+        NotificationLog.channel_type,
+        NotificationLog.status,
+        NotificationLog.timestamp
+    ).filter(NotificationLog.status.notin_(UNTRACKED_STATUSES))
+    if dialect == 'mysql':
+        # InnoDB的共享锁读取会锁住间隙，扫描期间新日志无法插入
+        query = query.with_for_update(read=True)
+    for row in query.execution_options(yield_per=1000):
+        counts[(row.user_id, row.channel_id, row.channel_type, row.status, stat_hour(row.timestamp))] += 1
+
+    db.session.bulk_insert_mappings(NotificationStat, [
+        {'user_id': user_id, 'channel_id': channel_id, 'channel_type': channel_type,
+         'status': status, 'hour': hour, 'count': count}
+        for (user_id, channel_id, channel_type, status, hour), count in counts.items()
+    ])
+    db.session.commit()
+    return len(counts)
+
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats():
+    """Recompute the notification statistics rollup from raw logs."""
+    print(f'Rebuilt {rebuild_notification_stats()} statistics buckets.')
 
 
 # 数据库模型
@@ -45,13 +137,53 @@ class NotificationLog(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     channel_id = db.Column(db.String(80), nullable=False)
     channel_type = db.Column(db.String(20), nullable=False)
-    request_data = db.Column(db.Text, nullable=False)
-    status = db.Column(db.String(10), nullable=False)
+    # 去掉token后压缩存储，列表接口不加载，仅详情接口读取
+    request_data = db.deferred(db.Column(db.Text, nullable=False))
+    request_preview = db.Column(db.String(200))
+    # pending/success/failed/scheduled/cancelled；日志提交后再更新状态时需加载旧值，统计才能扣减原状态
+    status = db.column_property(db.Column(db.String(10), nullable=False), active_history=True)
     error_message = db.Column(db.Text)
     timestamp = db.Column(db.DateTime, default=lambda: datetime.now(pytz.timezone('Asia/Shanghai')), index=True)
     ip_address = db.Column(db.String(45))
 
 
+class ScheduledNotification(db.Model):
+    """待发送的定时通知，按到期时间索引"""
+    id = db.Column(db.Integer, primary_key=True)
+    log_id = db.Column(db.Integer, nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    channel_pk = db.Column(db.Integer, nullable=False)  # NotificationChannel.id，通道删除后发送失败
+    content = db.Column(db.Text, nullable=False)  # 压缩后的content
+    due_at = db.Column(db.DateTime, nullable=False, index=True)  # 上海时区，不带tzinfo
+    claimed = db.Column(db.Boolean, nullable=False, default=False)  # 已被调度器认领发送，不能再取消或改期
+
+
+class LogEvent(db.Model):
+    """日志变更事件，供SSE服务按id增量读取后推送给控制台"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    log_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # created/updated/deleted
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class NotificationStat(db.Model):
+    """按小时预聚合的发送统计，随日志写入/删除增量维护"""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'channel_id', 'channel_type', 'status', 'hour',
+                            name='uq_notification_stat_bucket'),
+        db.Index('ix_notification_stat_user_hour', 'user_id', 'hour'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    channel_id = db.Column(db.String(80), nullable=False)
+    channel_type = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(10), nullable=False)
+    hour = db.Column(db.DateTime, nullable=False)  # 整点时间（上海时区，不带tzinfo）
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -85,6 +217,102 @@ class NotificationChannel(db.Model):
         self.config = ConfigEncryptor.encrypt_config(json.dumps(config_dict))
 
 
+def stat_hour(timestamp):
+    """将日志时间截断到整点，统一去掉tzinfo以兼容数据库读回的naive时间"""
+    if timestamp is None:
+        timestamp = datetime.now(pytz.timezone('Asia/Shanghai'))
+    return timestamp.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+# 发送中是短暂的中间状态，不计入统计表
+UNTRACKED_STATUSES = ('pending',)
+
+
+def _stat_key(log, status=None):
+    return (log.user_id, log.channel_id, log.channel_type, status or log.status, stat_hour(log.timestamp))
+
+
+def _apply_stat_deltas(connection, deltas):
+    """以upsert方式把计数增量写入统计表"""
+    table = NotificationStat.__table__
+    dialect = connection.dialect.name
+    for (user_id, channel_id, channel_type, status, hour), delta in deltas.items():
+        if not delta or status in UNTRACKED_STATUSES:
+            continue
+        bucket = (
+            (table.c.user_id == user_id) & (table.c.channel_id == channel_id) &
+            (table.c.channel_type == channel_type) & (table.c.status == status) &
+            (table.c.hour == hour)
+        )
+        if delta < 0:
+            # 删除只会减少已存在的桶
+            connection.execute(table.update().where(bucket).values(count=table.c.count + delta))
+            continue
+
+        values = dict(user_id=user_id, channel_id=channel_id, channel_type=channel_type,
+                      status=status, hour=hour, count=delta)
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(table).values(**values).on_conflict_do_update(
+                index_elements=['user_id', 'channel_id', 'channel_type', 'status', 'hour'],
+                set_={'count': table.c.count + delta}
+            )
+            connection.execute(stmt)
+        elif dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            stmt = insert(table).values(**values)
+            connection.execute(stmt.on_duplicate_key_update(count=table.c.count + delta))
+        else:
+            result = connection.execute(table.update().where(bucket).values(count=table.c.count + delta))
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(**values))
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_notification_stats(session, flush_context):
+    """日志新增、状态变更、删除时同步维护统计表"""
+    deltas = defaultdict(int)
+    for obj in session.new:
+        if isinstance(obj, NotificationLog):
+            deltas[_stat_key(obj)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, NotificationLog):
+            # 同一次flush中新增又删除的对象不会出现在这里
+            old_status = db.inspect(obj).attrs.status.history.deleted
+            deltas[_stat_key(obj, old_status[0] if old_status else None)] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, NotificationLog) and obj not in session.deleted:
+            history = db.inspect(obj).attrs.status.history
+            if history.deleted and history.added and history.deleted[0] != history.added[0]:
+                deltas[_stat_key(obj, history.deleted[0])] -= 1
+                deltas[_stat_key(obj, history.added[0])] += 1
+    if deltas:
+        _apply_stat_deltas(session.connection(), deltas)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _record_log_events(session, flush_context):
+    """记录日志的新增、更新、删除事件"""
+    events = []
+    for obj in session.new:
+        if isinstance(obj, NotificationLog):
+            events.append((obj, 'created'))
+    for obj in session.dirty:
+        if isinstance(obj, NotificationLog) and obj not in session.deleted and session.is_modified(obj):
+            events.append((obj, 'updated'))
+    for obj in session.deleted:
+        if isinstance(obj, NotificationLog):
+            events.append((obj, 'deleted'))
+    if events:
+        now = local_now()
+        session.connection().execute(LogEvent.__table__.insert(), [
+            {'user_id': obj.user_id, 'log_id': obj.id, 'action': action, 'created_at': now}
+            for obj, action in events
+        ])
+
 
 # 表单
 class RegistrationForm(FlaskForm):
@@ -116,23 +344,28 @@ class LoginForm(FlaskForm):
 
 class ChannelForm(FlaskForm):
     channel_id = StringField('通道名称', validators=[DataRequired(), Length(min=2, max=50)])
-    channel_type = SelectField('通道类型', choices=[
-        ('smtp', 'SMTP邮件'),
-        ('sms', '阿里云短信'),
-        ('tg', 'Telegram'),
-        ('dingtalk', '钉钉'),
-        ('feishu', '飞书'),
-        ('wechat', '企业微信'),
-        ('webhook', 'webhook')
-    ], validators=[DataRequired()])
+    channel_type = SelectField('通道类型', validators=[DataRequired()])
     config = TextAreaField('配置(JSON格式)', validators=[DataRequired()])
     submit = SubmitField('保存')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.channel_type.choices = list(senders.channel_labels().items())
+
     def validate_config(self, config):
         try:
-            json.loads(config.data)
+            config_dict = json.loads(config.data)
         except ValueError:
             raise ValidationError('配置必须是有效的JSON格式')
+        if not isinstance(config_dict, dict):
+            raise ValidationError('配置必须是JSON对象')
+
+        sender = senders.get_sender(self.channel_type.data)
+        if sender is not None:
+            try:
+                sender.validate_config(config_dict)
+            except ValueError as e:
+                raise ValidationError(str(e))
 
 
 # 登录管理器
@@ -293,6 +526,44 @@ def delete_channel(channel_id):
     return redirect(url_for('dashboard'))
 
 
+rate_limit_store = SqliteBucketStore(app.config['RATE_LIMIT_STORAGE'] or None)
+
+PRIORITIES = ('critical', 'normal', 'bulk')
+RETRY_AFTER_MAX = 3600
+
+
+def send_capacity_bucket(priority):
+    """全局发送容量，低优先级请求不能用掉为高优先级预留的部分"""
+    reserve = {
+        'critical': 0,
+        'normal': app.config['SEND_CRITICAL_RESERVE'],
+        'bulk': app.config['SEND_BULK_RESERVE']
+    }[priority]
+    burst = app.config['SEND_BURST']
+    return Bucket('send', app.config['SEND_RATE'], burst, floor=burst * reserve)
+
+
+def admit(buckets, key, user_id=None, final=True):
+    """令牌桶准入，拒绝时返回429响应；非最终检查只记录拒绝次数"""
+    # 速率为0的桶不启用
+    buckets = [bucket for bucket in buckets if bucket.rate > 0]
+    if not app.config['RATE_LIMIT_ENABLED'] or not buckets:
+        return None
+    try:
+        retry_after = rate_limit_store.acquire(buckets)
+        if retry_after or final:
+            rate_limit_store.record(key, not retry_after, user_id)
+    except sqlite3.Error as e:
+        # 限流存储不可用时放行，不影响通知发送
+        app.logger.error(f"准入控制失败: {str(e)}")
+        return None
+    if not retry_after:
+        return None
+    response = jsonify({'status': 'error', 'message': '请求过于频繁，请稍后重试'})
+    response.headers['Retry-After'] = str(max(1, math.ceil(min(retry_after, RETRY_AFTER_MAX))))
+    return response, 429
+
+
 @app.route('/api/notify', methods=['POST'])
 def notify():
     # 获取请求数据和IP地址
@@ -304,6 +575,23 @@ def notify():
         if not data or 'token' not in data or 'id' not in data or 'content' not in data:
             return jsonify({'status': 'error', 'message': '缺少必要参数'}), 400
 
+        priority = data.get('priority', 'normal')
+        if priority not in PRIORITIES:
+            return jsonify({'status': 'error', 'message': 'priority必须是critical、normal或bulk'}), 400
+
+        # 查询用户前先按客户端IP限流，随机token的洪泛无法绕过
+        rejected = admit([Bucket(f'ip:{ip_address}', app.config['IP_RATE'], app.config['IP_BURST'])],
+                         f'ip:{ip_address}', final=False)
+        if rejected:
+            return rejected
+
+        # 再按token限流，同一token分散到多个IP时也受限制
+        key = token_key(str(data['token']))
+        rejected = admit([Bucket(f'token:{key}', app.config['TOKEN_RATE'], app.config['TOKEN_BURST'])], key,
+                         final=False)
+        if rejected:
+            return rejected
+
         # 验证用户token
         user = User.query.filter_by(token=data['token']).first()
         if not user:
@@ -317,44 +605,68 @@ def notify():
         if not channel:
             return jsonify({'status': 'error', 'message': '通道名称不存在'}), 404
 
+        # 定时发送参数（send_at 或 delay 秒）
+        try:
+            due_at = parse_schedule(data)
+        except (TypeError, ValueError):
+            return jsonify({'status': 'error', 'message': 'send_at或delay格式错误'}), 400
+        scheduled = due_at is not None and due_at > local_now()
+
+        # 按用户限流；立即发送的通知还需占用全局发送容量
+        buckets = [Bucket(f'user:{user.id}', app.config['USER_RATE'], app.config['USER_BURST'])]
+        if not scheduled:
+            buckets.append(send_capacity_bucket(priority))
+        rejected = admit(buckets, key, user.id)
+        if rejected:
+            return rejected
+
         # 现在可以安全地创建日志记录
+        request_body = RequestDataCodec.sanitize(data)
         log_entry = NotificationLog(
             user_id=user.id,  # 使用已验证的用户ID
             channel_id=data.get('id', ''),
             channel_type=channel.channel_type,
-            request_data=json.dumps(data, ensure_ascii=False),
-            status='failed',  # 默认设为失败，成功时更新
+            request_data=RequestDataCodec.compress(request_body),
+            request_preview=RequestDataCodec.preview(request_body),
+            status='scheduled' if scheduled else 'pending',  # 发送完成后更新为成功或失败
             ip_address=ip_address,
             timestamp=datetime.now(pytz.timezone('Asia/Shanghai'))
         )
         db.session.add(log_entry)
-        db.session.flush()  # 获取log_entry.id但不提交事务
+        # 发送前先提交日志，避免发送期间一直持有写事务（SQLite下会阻塞其他请求，也无法合并发送）
+        db.session.commit()
+
+        if scheduled:
+            item = ScheduledNotification(
+                log_id=log_entry.id,
+                user_id=user.id,
+                channel_pk=channel.id,
+                content=RequestDataCodec.compress(json.dumps(data['content'], ensure_ascii=False)),
+                due_at=due_at
+            )
+            db.session.add(item)
+            db.session.commit()
+            scheduler.schedule(item.id, due_at)
+            return jsonify({
+                'status': 'success',
+                'message': '通知已计划发送',
+                'log_id': log_entry.id,
+                'send_at': due_at.isoformat()
+            }), 202
 
         try:
             # 使用解密后的配置
             config = channel.get_decrypted_config()
-            result = None
-
-            # 根据通道类型调用不同的发送方法
-            if channel.channel_type == 'smtp':
-                result = send_email(config, data['content'])
-            elif channel.channel_type == 'sms':
-                result = send_sms(config, data['content'])
-            elif channel.channel_type == 'tg':
-                result = send_telegram(config, data['content'])
-            elif channel.channel_type == 'dingtalk':
-                result = send_dingtalk(config, data['content'])
-            elif channel.channel_type == 'feishu':
-                result = send_feishu(config, data['content'])
-            elif channel.channel_type == 'wechat':
-                result = send_wechat(config, data['content'])
-            elif channel.channel_type == 'webhook':
-                result = send_webhook(config, data['content'])
-            else:
+
+            # 根据通道类型获取发送器
+            sender = senders.get_sender(channel.channel_type)
+            if sender is None:
                 error_msg = '不支持的通道类型'
+                log_entry.status = 'failed'
                 log_entry.error_message = error_msg
                 db.session.commit()
                 return jsonify({'status': 'error', 'message': error_msg}), 400
+            senders.send(channel.channel_type, config, data['content'], app.config['SEND_BATCH_WINDOW'])
 
             # 发送成功，更新日志状态
             log_entry.status = 'success'
@@ -377,45 +689,311 @@ def notify():
         return jsonify({'status': 'error', 'message': error_msg}), 400
 
 
-@app.route('/api/logs', methods=['GET'])
-@login_required
-def get_logs():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    search_query = request.args.get('search', '').strip()
+def local_now():
+    return datetime.now(pytz.timezone('Asia/Shanghai')).replace(tzinfo=None)
+
+
+def parse_schedule(data):
+    """解析send_at（ISO时间）或delay（秒），均未提供时返回None"""
+    if data.get('send_at'):
+        return parse_local_time(data['send_at'])
+    if data.get('delay') is not None:
+        delay = float(data['delay'])
+        if delay < 0:
+            raise ValueError('delay不能为负数')
+        return local_now() + timedelta(seconds=delay)
+    return None
+
+
+def load_scheduled(start, end):
+    """按到期时间范围加载待发送任务，start为None时包含所有已过期任务"""
+    with app.app_context():
+        query = db.session.query(ScheduledNotification.due_at, ScheduledNotification.id).filter(
+            ScheduledNotification.due_at < end
+        )
+        if start is not None:
+            query = query.filter(ScheduledNotification.due_at >= start)
+        items = [tuple(row) for row in query.order_by(ScheduledNotification.due_at).execution_options(yield_per=1000)]
+        db.session.remove()
+    return items
+
+
+def dispatch_scheduled(scheduled_id):
+    """发送到期的定时通知
+
+    先把到期时间推后一个租约周期作为认领，多个worker只有一个能认领成功；
+    认领后进程退出导致未完成的任务会在租约到期后被重新加载发送。
+    认领前先占用一个发送线程，任务不会在线程池队列中等待到租约过期而被重复认领。
+    """
+    scheduled_slots.acquire()
+    slot_in_use = False
+    try:
+        with app.app_context():
+            table = ScheduledNotification.__table__
+            now = local_now()
+            lease_until = now + timedelta(seconds=app.config['SCHEDULER_LEASE'])
+            claimed = db.session.execute(
+                table.update().where(table.c.id == scheduled_id, table.c.due_at <= now).values(
+                    due_at=lease_until, claimed=True)
+            ).rowcount
+            db.session.commit()
+            if not claimed:
+                db.session.remove()
+                return
+            scheduler.schedule(scheduled_id, lease_until)
+
+            item = db.session.get(ScheduledNotification, scheduled_id)
+            log_entry = db.session.get(NotificationLog, item.log_id) if item else None
+            if log_entry is None:
+                if item is not None:
+                    db.session.delete(item)
+                    db.session.commit()
+                db.session.remove()
+                return
+
+            try:
+                channel = db.session.get(NotificationChannel, item.channel_pk)
+                if channel is None or channel.user_id != item.user_id:
+                    raise Exception('通道名称不存在')
+                content = json.loads(RequestDataCodec.decompress(item.content))
+                config = channel.get_decrypted_config()
+                window = app.config['SEND_BATCH_WINDOW']
+                # 不等待发送结果，同时到期的通知可以合并发送；合并发送由收集线程完成，不占用发送线程
+                if senders.batches(channel.channel_type, config, window):
+                    future = senders.submit(channel.channel_type, config, content, window)
+                else:
+                    future = senders.submit(channel.channel_type, config, content, executor=scheduled_executor)
+                    slot_in_use = True
+                    future.add_done_callback(lambda f: scheduled_slots.release())
+            except Exception as e:
+                db.session.remove()
+                complete_scheduled(scheduled_id, e)
+                return
+            db.session.remove()
+            future.add_done_callback(lambda f: complete_scheduled(scheduled_id, f.exception()))
+    finally:
+        if not slot_in_use:
+            scheduled_slots.release()
+
+
+def complete_scheduled(scheduled_id, error):
+    """记录定时通知的发送结果并移除任务"""
+    with app.app_context():
+        item = db.session.get(ScheduledNotification, scheduled_id)
+        if item is None:
+            db.session.remove()
+            return
+        log_entry = db.session.get(NotificationLog, item.log_id)
+        if log_entry is not None:
+            if error is None:
+                log_entry.status = 'success'
+            else:
+                log_entry.status = 'failed'
+                log_entry.error_message = str(error)
+                app.logger.error(f"定时通知发送失败: {error}")
+        db.session.delete(item)
+        db.session.commit()
+        db.session.remove()
+
+
+scheduler = TimerScheduler(
+    dispatch=dispatch_scheduled,
+    load=load_scheduled,
+    now=local_now,
+    window=timedelta(seconds=app.config['SCHEDULER_WINDOW'])
+)
+# 定时通知在独立线程池中发送，单个无响应的通道不会阻塞调度线程
+scheduled_executor = ThreadPoolExecutor(app.config['SCHEDULER_WORKERS'], thread_name_prefix='notify-scheduled')
+scheduled_slots = threading.BoundedSemaphore(app.config['SCHEDULER_WORKERS'])
+
+
+def start_scheduler():
+    """在worker进程启动时调用（见gunicorn.conf.py），CLI命令不会启动调度线程"""
+    if app.config['SCHEDULER_ENABLED'] and not scheduler.running:
+        scheduler.start()
+
+
+MAINTENANCE_INTERVAL = 60
+maintenance_thread = None
+
+
+def sweep_pending_logs(since=None):
+    """将超时仍处于发送中的日志标记为失败（worker在发送过程中退出时遗留），返回本次的截止时间"""
+    cutoff = local_now() - timedelta(seconds=app.config['SEND_PENDING_TIMEOUT'])
+    error_msg = '发送超时，结果未知'
+    table = NotificationLog.__table__
+    with app.app_context():
+        last_id = 0
+        while True:
+            query = NotificationLog.query.filter(
+                NotificationLog.status == 'pending',
+                NotificationLog.timestamp < cutoff,
+                NotificationLog.id > last_id
+            )
+            if since is not None:
+                query = query.filter(NotificationLog.timestamp >= since)
+            logs = query.order_by(NotificationLog.id).limit(500).all()
+            for log in logs:
+                # 条件更新占住该行，多个worker同时清理时只有一个会修改状态，统计不会重复计数
+                if db.session.execute(table.update().where(
+                        table.c.id == log.id, table.c.status == 'pending').values(error_message=error_msg)).rowcount:
+                    log.status = 'failed'
+                    log.error_message = error_msg
+            db.session.commit()
+            if len(logs) < 500:
+                break
+            last_id = logs[-1].id
+        db.session.remove()
+    return cutoff
+
+
+def run_maintenance():
+    """worker内的定期维护；首次全量检查，之后只检查上次截止时间之后的日志"""
+    since = None
+    while True:
+        try:
+            cutoff = sweep_pending_logs(since)
+            since = cutoff - timedelta(seconds=MAINTENANCE_INTERVAL)
+            # 未运行SSE服务时也要清理日志事件，避免事件表无限增长
+            _prune_log_events()
+        except Exception:
+            app.logger.exception('定期维护失败')
+        time.sleep(MAINTENANCE_INTERVAL)
+
+
+def start_maintenance():
+    """在worker进程启动时调用（见gunicorn.conf.py）"""
+    global maintenance_thread
+    if maintenance_thread is None or not maintenance_thread.is_alive():
+        maintenance_thread = threading.Thread(target=run_maintenance, name='notify-maintenance', daemon=True)
+        maintenance_thread.start()
+
+
+def warm_up_senders():
+    """worker启动时预热已配置通道的发送器"""
+    with app.app_context():
+        channel_types = [row[0] for row in db.session.query(NotificationChannel.channel_type).distinct()]
+        db.session.remove()
+    senders.warm_up(channel_types)
+
+
+@app.route('/api/admission', methods=['GET'])
+def admission_stats():
+    """运维查看各token的准入速率与拒绝次数"""
+    operator_token = app.config['OPERATOR_TOKEN']
+    if not operator_token:
+        return jsonify({'status': 'error', 'message': '未开启'}), 404
+    authorization = request.headers.get('Authorization', '')
+    provided = authorization[len('Bearer '):] if authorization.startswith('Bearer ') else ''
+    if not hmac.compare_digest(provided.encode(), operator_token.encode()):
+        return jsonify({'status': 'error', 'message': '无效凭证'}), 401
+    return jsonify({'tokens': rate_limit_store.snapshot()})
+
+
+def find_scheduled(data, log_id):
+    """按token和日志id查找待发送的定时通知，返回(item, 错误响应)"""
+    if not data or 'token' not in data:
+        return None, (jsonify({'status': 'error', 'message': '缺少必要参数'}), 400)
+    user = User.query.filter_by(token=data['token']).first()
+    if not user:
+        return None, (jsonify({'status': 'error', 'message': '无效token'}), 401)
+    item = ScheduledNotification.query.filter_by(log_id=log_id, user_id=user.id).first()
+    if not item:
+        return None, (jsonify({'status': 'error', 'message': '定时通知不存在或已发送'}), 404)
+    return item, None
+
+
+@app.route('/api/notify/<int:log_id>/cancel', methods=['POST'])
+def cancel_scheduled(log_id):
+    item, error = find_scheduled(request.get_json(silent=True), log_id)
+    if error:
+        return error
+
+    # 条件删除，与调度器的认领互斥
+    table = ScheduledNotification.__table__
+    deleted = db.session.execute(
+        table.delete().where(table.c.id == item.id, table.c.claimed.is_(False))
+    ).rowcount
+    if not deleted:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': '定时通知正在发送，无法取消'}), 409
+    log_entry = db.session.get(NotificationLog, log_id)
+    if log_entry is not None:
+        log_entry.status = 'cancelled'
+    db.session.commit()
+    return jsonify({'status': 'success', 'message': '定时通知已取消'})
+
 
-    # 构建基础查询
-    query = NotificationLog.query.filter_by(user_id=current_user.id)
+@app.route('/api/notify/<int:log_id>/reschedule', methods=['POST'])
+def reschedule_scheduled(log_id):
+    data = request.get_json(silent=True)
+    item, error = find_scheduled(data, log_id)
+    if error:
+        return error
 
-    # 添加搜索条件
+    try:
+        due_at = parse_schedule(data)
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'send_at或delay格式错误'}), 400
+    if due_at is None:
+        return jsonify({'status': 'error', 'message': '缺少send_at或delay参数'}), 400
+
+    table = ScheduledNotification.__table__
+    updated = db.session.execute(
+        table.update().where(table.c.id == item.id, table.c.claimed.is_(False)).values(due_at=due_at)
+    ).rowcount
+    db.session.commit()
+    if not updated:
+        return jsonify({'status': 'error', 'message': '定时通知正在发送，无法重新计划'}), 409
+    scheduler.schedule(item.id, due_at)
+    return jsonify({'status': 'success', 'message': '定时通知已重新计划', 'send_at': due_at.isoformat()})
+
+
+def filter_logs(query, search_query):
+    """日志列表与导出共用的搜索条件"""
     if search_query:
         query = query.filter(
             db.or_(
                 NotificationLog.channel_id.ilike(f'%{search_query}%'),
                 NotificationLog.channel_type.ilike(f'%{search_query}%'),
                 NotificationLog.error_message.ilike(f'%{search_query}%'),
-                NotificationLog.request_data.ilike(f'%{search_query}%'),
+                NotificationLog.request_preview.ilike(f'%{search_query}%'),
                 NotificationLog.ip_address.ilike(f'%{search_query}%')
             )
         )
+    return query
+
+
+def log_summary(log):
+    """日志列表中的单条日志（不含完整请求数据）"""
+    return {
+        'id': log.id,
+        'channel_id': log.channel_id,
+        'channel_type': log.channel_type,
+        'status': log.status,
+        'timestamp': log.timestamp.isoformat(),
+        'request_preview': log.request_preview,
+        'error_message': log.error_message,
+        'ip_address': log.ip_address
+    }
+
+
+@app.route('/api/logs', methods=['GET'])
+@login_required
+def get_logs():
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    search_query = request.args.get('search', '').strip()
+
+    # 构建基础查询并添加搜索条件
+    query = filter_logs(NotificationLog.query.filter_by(user_id=current_user.id), search_query)
 
     # 按时间降序排序并分页
     logs = query.order_by(NotificationLog.timestamp.desc()).paginate(
         page=page, per_page=per_page, error_out=False)
 
     # 准备返回数据
-    logs_data = []
-    for log in logs.items:
-        logs_data.append({
-            'id': log.id,
-            'channel_id': log.channel_id,
-            'channel_type': log.channel_type,
-            'status': log.status,
-            'timestamp': log.timestamp.isoformat(),
-            'request_data': log.request_data,
-            'error_message': log.error_message,
-            'ip_address': log.ip_address
-        })
+    logs_data = [log_summary(log) for log in logs.items]
 
     return jsonify({
         'logs': logs_data,
@@ -424,6 +1002,119 @@ def get_logs():
         'current_page': page
     })
 
+EXPORT_FIELDS = ['id', 'channel_id', 'channel_type', 'status', 'timestamp', 'request_data', 'error_message', 'ip_address']
+EXPORT_CHUNK_SIZE = 1000
+
+
+def parse_local_time(value):
+    """解析ISO时间，带时区的转换为上海时间，统一去掉tzinfo与库中数据比较"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(pytz.timezone('Asia/Shanghai')).replace(tzinfo=None)
+    return parsed
+
+
+def iter_export_rows(user_id, search_query, start, end):
+    """按id分段读取日志，每段结束即释放读事务，内存与锁占用都不随导出规模增长"""
+    last_id = 0
+    while True:
+        query = filter_logs(db.session.query(
+            *(getattr(NotificationLog, field) for field in EXPORT_FIELDS)
+        ).filter(
+            NotificationLog.user_id == user_id,
+            NotificationLog.id > last_id
+        ), search_query)
+        if start:
+            query = query.filter(NotificationLog.timestamp >= start)
+        if end:
+            query = query.filter(NotificationLog.timestamp < end)
+
+        count = 0
+        for row in query.order_by(NotificationLog.id).limit(EXPORT_CHUNK_SIZE).execution_options(
+                yield_per=200):
+            count += 1
+            last_id = row.id
+            yield row
+        db.session.rollback()
+        if count < EXPORT_CHUNK_SIZE:
+            return
+
+
+def export_record(row):
+    record = dict(zip(EXPORT_FIELDS, row))
+    record['timestamp'] = row.timestamp.isoformat() if row.timestamp else None
+    record['request_data'] = RequestDataCodec.decompress(row.request_data)
+    return record
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(export_record(row), ensure_ascii=False) + '\n'
+
+
+def iter_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        record = export_record(row)
+        writer.writerow([record[field] for field in EXPORT_FIELDS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_gzip(chunks):
+    """边生成边压缩，输出标准gzip流"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@app.route('/api/logs/export', methods=['GET'])
+@login_required
+def export_logs():
+    export_format = request.args.get('format', 'ndjson').lower()
+    search_query = request.args.get('search', '').strip()
+    use_gzip = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'status': 'error', 'message': '不支持的导出格式'}), 400
+
+    # 时间范围（ISO格式，上海时区时间），左闭右开
+    try:
+        start = parse_local_time(request.args.get('start'))
+        end = parse_local_time(request.args.get('end'))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': '时间格式错误，请使用ISO格式'}), 400
+
+    rows = iter_export_rows(current_user.id, search_query, start, end)
+    if export_format == 'csv':
+        chunks = iter_csv(rows)
+        mimetype = 'text/csv'
+    else:
+        chunks = iter_ndjson(rows)
+        mimetype = 'application/x-ndjson'
+
+    filename = f'notification_logs.{export_format}'
+    if use_gzip:
+        chunks = iter_gzip(chunks)
+        mimetype = 'application/gzip'
+        filename += '.gz'
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
 @app.route('/api/logs/<int:log_id>', methods=['GET'])
 @login_required
 def get_log_detail(log_id):
@@ -439,7 +1130,7 @@ def get_log_detail(log_id):
         'channel_type': log.channel_type,
         'status': log.status,
         'timestamp': log.timestamp.isoformat(),
-        'request_data': log.request_data,
+        'request_data': RequestDataCodec.decompress(log.request_data),
         'error_message': log.error_message,
         'ip_address': log.ip_address
     })
@@ -453,6 +1144,8 @@ def delete_log(log_id):
     if log.user_id != current_user.id:
         return jsonify({'status': 'error', 'message': '无权删除该日志'}), 403
 
+    # 删除日志同时取消尚未发送的定时通知
+    ScheduledNotification.query.filter_by(log_id=log.id).delete()
     db.session.delete(log)
     db.session.commit()
     return jsonify({'status': 'success', 'message': '日志已删除'})
@@ -474,7 +1167,10 @@ def delete_logs_batch():
     if len(logs) != len(data['log_ids']):
         return jsonify({'status': 'error', 'message': '包含无权删除的日志'}), 403
 
-    # 批量删除
+    # 批量删除，同时取消尚未发送的定时通知
+    ScheduledNotification.query.filter(
+        ScheduledNotification.log_id.in_([log.id for log in logs])
+    ).delete(synchronize_session=False)
     for log in logs:
         db.session.delete(log)
     db.session.commit()
@@ -485,312 +1181,181 @@ def delete_logs_batch():
     })
 
 
-def send_email(config, content):
-    """发送邮件通知（支持国际化地址和完整发件人格式）"""
-    try:
-        # 1. 内容解析与校验
-        if isinstance(content, str):
-            try:
-                content = json.loads(content)
-            except json.JSONDecodeError:
-                content = {"text_body": content}
-
-        required_fields = ['to_email', 'subject', 'text_body']
-        for field in required_fields:
-            if field not in content:
-                raise ValueError(f"缺少必要字段: {field}")
-
-        # 2. 构建邮件头（国际化兼容处理）
-        def format_email_address(display_name, email_address):
-            """标准化邮箱地址格式"""
-            try:
-                # 处理国际化域名（如 公司.中国 -> xn--fiq228c.xn--fiqs8s）
-                local_part, domain = email_address.split('@')
-                domain_ascii = idna.encode(domain).decode('ascii')
-                email_ascii = f"{local_part}@{domain_ascii}"
-
-                # 返回格式化后的地址
-                if display_name:
-                    return formataddr((display_name, email_ascii))
-                return email_ascii
-            except Exception as e:
-                raise ValueError(f"邮箱地址格式错误: {str(e)}")
-
-        # 3. 构建邮件消息
-        msg = MIMEText(content['text_body'], 'html', 'utf-8')
-        msg['Subject'] = content['subject']
-
-        # 发件人处理（显示名 + 配置中的邮箱）
-        from_name = content.get('from_name', '').strip()
-        msg['From'] = format_email_address(
-            from_name,
-            config['smtp_username']
-        )
-
-        # 收件人处理（支持多个收件人，用逗号分隔）
-        to_emails = [e.strip() for e in content['to_email'].split(',')]
-        msg['To'] = ', '.join(
-            format_email_address(None, email) for email in to_emails
-        )
-
-        # 4. 邮件服务器连接（自动选择加密方式）
-        port = config.get('smtp_port', 465)
-        if config.get('use_ssl') or port == 465:
-            server = smtplib.SMTP_SSL(config['smtp_server'], port, timeout=10)
-        else:
-            server = smtplib.SMTP(config['smtp_server'], port, timeout=10)
-            try:
-                server.starttls()
-            except smtplib.SMTPNotSupportedError:
-                pass
-
-        # 5. 发送邮件
-        server.login(config['smtp_username'], config['smtp_password'])
-        server.send_message(msg)
-        server.quit()
-        return True
-
-    except Exception as e:
-        raise Exception(f"邮件发送失败: {str(e)}")
-
+def events_serializer():
+    return URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='log-events')
 
-def send_sms(config, content):
-    """发送阿里云短信通知（支持字典或JSON字符串输入）"""
-    try:
-        from alibabacloud_dysmsapi20170525.client import Client as DysmsapiClient
-        from alibabacloud_tea_openapi import models as open_api_models
-        from alibabacloud_dysmsapi20170525 import models as dysmsapi_models
-        from alibabacloud_tea_util import models as util_models
-        import json
-
-        # 1. 检查config是否包含AK/SK
-        if 'access_key_id' not in config or 'access_key_secret' not in config:
-            raise ValueError("config必须包含access_key_id和access_key_secret")
-
-        # 2. 处理content（支持字典或JSON字符串）
-        if isinstance(content, str):
-            try:
-                content = json.loads(content)
-            except json.JSONDecodeError:
-                raise ValueError("content必须是字典或合法JSON字符串")
-        if not isinstance(content, dict):
-            raise ValueError("content必须是字典或JSON字符串")
-
-        # 3. 检查必要参数
-        required_fields = ['phone_numbers', 'sign_name', 'template_code']
-        for field in required_fields:
-            if field not in content:
-                raise ValueError(f"content缺少必要参数: {field}")
-
-        # 4. 创建配置
-        api_config = open_api_models.Config(
-            access_key_id=config['access_key_id'],
-            access_key_secret=config['access_key_secret']
-        )
-        api_config.endpoint = 'dysmsapi.aliyuncs.com'
-
-        # 5. 初始化客户端
-        client = DysmsapiClient(api_config)
-
-        # 6. 提取模板变量（排除系统参数）
-        template_vars = {
-            k: str(v) for k, v in content.items()
-            if k not in required_fields
-        }
-
-        # 7. 构造请求参数
-        send_sms_request = dysmsapi_models.SendSmsRequest(
-            phone_numbers=content['phone_numbers'],
-            sign_name=content['sign_name'],
-            template_code=content['template_code'],
-            template_param=json.dumps(template_vars, separators=(',', ':'))
-        )
 
-        # 8. 发送短信
-        response = client.send_sms_with_options(
-            send_sms_request,
-            util_models.RuntimeOptions()
-        )
-
-        if response.body.code != 'OK':
-            raise Exception(f"短信发送失败: {response.body.message}")
-        return True
-
-    except Exception as e:
-        raise Exception(f"短信发送失败: {str(e)}")
+@app.route('/api/logs/events/token', methods=['GET'])
+@login_required
+def log_events_token():
+    """签发连接SSE服务的短期凭证"""
+    return jsonify({
+        'token': events_serializer().dumps(current_user.id),
+        'url': app.config['EVENTS_PUBLIC_URL'] or None,
+        'port': app.config['EVENTS_PORT']
+    })
 
 
-def send_telegram(config, content):
-    """发送Telegram通知"""
+def _authenticate_events(token):
     try:
-        # 确保api_url没有结尾斜杠
-        api_url = config['api_url'].rstrip('/')
-        url = f"{api_url}/bot{config['bot_token']}/sendMessage"
-
-        payload = {
-            'chat_id': config['chat_id'],
-            'text': content,
-            'parse_mode': 'HTML'
-        }
-
-        # 根据is_proxy决定是否使用代理
-        proxies = None
-        if config.get('is_proxy', False):
-            if 'https_proxy' not in config:
-                raise ValueError("启用代理但未配置https_proxy")
-            proxies = {
-                'https': config['https_proxy']
-            }
-
-        # 发送请求
-        response = requests.post(
-            url,
-            data=payload,
-            proxies=proxies,  # 自动处理None情况
-            timeout=10
-        )
-        response.raise_for_status()
-
-        # 检查Telegram返回的错误
-        result = response.json()
-        if not result.get('ok'):
-            raise Exception(f"Telegram API错误: {result.get('description')}")
-
-        return True
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"网络请求失败: {str(e)}")
-    except Exception as e:
-        raise Exception(f"Telegram发送失败: {str(e)}")
+        return events_serializer().loads(token, max_age=app.config['EVENTS_TOKEN_MAX_AGE'])
+    except BadSignature:
+        return None
+
+
+def _log_events(query, limit):
+    rows = query.outerjoin(
+        NotificationLog, NotificationLog.id == LogEvent.log_id
+    ).add_columns(LogEvent.action, NotificationLog).order_by(LogEvent.id).limit(limit).all()
+    events = []
+    for event_row, action, log in rows:
+        if log is None or action == 'deleted':
+            payload = {'action': 'deleted', 'log': {'id': event_row.log_id}}
+        else:
+            payload = {'action': action, 'log': log_summary(log)}
+        events.append((event_row.id, event_row.user_id, payload))
+    return events
 
-def send_dingtalk(config, content):
-    """发送钉钉通知（支持加签验证）"""
-    try:
-        webhook_url = config['webhook_url']
-        secret = config.get('secret')
-
-        if config.get('msg_type', 'text') == 'text':
-            payload = {
-                "msgtype": "text",
-                "text": {
-                    "content": content
-                }
-            }
-        else:  # markdown
-            payload = {
-                "msgtype": "markdown",
-                "markdown": {
-                    "title": config.get('title', '通知'),
-                    "text": content
-                }
-            }
-
-        if config.get('at_mobiles'):
-            payload["at"] = {
-                "atMobiles": config['at_mobiles'],
-                "isAtAll": False
-            }
-
-        if secret:
-            timestamp = str(round(time.time() * 1000))
-            sign = generate_sign(secret, timestamp)
-            webhook_url = f"{webhook_url}&timestamp={timestamp}&sign={sign}"
-
-        response = requests.post(webhook_url, json=payload)
-        result = response.json()
-        if result.get('errcode') != 0:
-            raise Exception(f"钉钉发送失败: {result.get('errmsg')}")
-        return True
-    except Exception as e:
-        raise Exception(f"钉钉发送失败: {str(e)}")
-def generate_sign(secret, timestamp):
-    """生成钉钉加签签名"""
-    string_to_sign = f"{timestamp}\n{secret}"
-    hmac_code = hmac.new(
-        secret.encode('utf-8'),
-        string_to_sign.encode('utf-8'),
-        hashlib.sha256
-    ).digest()
-    return urllib.parse.quote_plus(base64.b64encode(hmac_code))
-
-
-def send_feishu(config, content):
-    """发送飞书通知"""
-    try:
-        webhook_url = config['webhook_url']
 
-        payload = {
-            "msg_type": "text",
-            "content": {
-                "text": content
-            }
-        }
+def _fetch_log_events(last_id, limit):
+    with app.app_context():
+        query = db.session.query(LogEvent).filter(LogEvent.id > last_id)
+        events = _log_events(query, limit)
+        db.session.remove()
+    return events
 
-        response = requests.post(webhook_url, json=payload)
-        result = response.json()
 
-        if result.get('code') != 0:
-            raise Exception(f"飞书发送失败: {result.get('msg')}")
-        return True
-    except Exception as e:
-        raise Exception(f"飞书发送失败: {str(e)}")
+def _fetch_user_log_events(user_id, last_id, limit):
+    with app.app_context():
+        query = db.session.query(LogEvent).filter(LogEvent.user_id == user_id, LogEvent.id > last_id)
+        events = _log_events(query, limit)
+        db.session.remove()
+    return events
 
-def send_wechat(config, content):
-    """发送钉钉通知"""
-    try:
-        webhook_url = config['webhook_url']
-
-        if config.get('msg_type', 'text') == 'text':
-            payload = {
-                "msgtype": "text",
-                "text": {
-                    "content": content
-                }
-            }
-        else:  # markdown
-            payload = {
-                "msgtype": "markdown",
-                "markdown": {
-                    "content": content
-                }
-            }
-
-        response = requests.post(webhook_url, json=payload)
-        result = response.json()
-
-        if result.get('errcode') != 0:
-            raise Exception(f"钉钉发送失败: {result.get('errmsg')}")
-        return True
-    except Exception as e:
-        raise Exception(f"钉钉发送失败: {str(e)}")
 
-def send_webhook(config, content):
-    """发送webhook通知"""
-    try:
-        webhook_url = config['webhook_url']
+def _latest_log_event_id():
+    with app.app_context():
+        latest = db.session.query(db.func.max(LogEvent.id)).scalar()
+        db.session.remove()
+    return latest
 
-        try:
-            payload = json.loads(content)
-        except json.JSONDecodeError:
-            raise Exception(f"提交JSON格式错误")
-        response = requests.post(webhook_url, json=payload)
-        result = response.json()
 
-        if result.get('code') != 200:
-            raise Exception(f"webhook发送失败: {result.get('msg')}，以返回的code及msg作为发送成功与否的标准")
-        return True
+def _oldest_log_event_id():
+    with app.app_context():
+        oldest = db.session.query(db.func.min(LogEvent.id)).scalar()
+        db.session.remove()
+    return oldest
 
-    except Exception as e:
-        raise Exception(f"webhook发送失败: {str(e)}，以返回的code及msg作为发送成功与否的标准")
 
+def _prune_log_events():
+    with app.app_context():
+        cutoff = local_now() - timedelta(seconds=app.config['EVENTS_RETENTION'])
+        LogEvent.query.filter(LogEvent.created_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+        db.session.remove()
+
+
+@app.cli.command('serve-events')
+def serve_events():
+    """Run the server-sent events service for live dashboard logs."""
+    import logging
+    from utils.sse import SseServer
+    logging.basicConfig(level=logging.INFO)
+    SseServer(
+        authenticate=_authenticate_events,
+        fetch_since=_fetch_log_events,
+        fetch_for_user=_fetch_user_log_events,
+        latest_id=_latest_log_event_id,
+        oldest_id=_oldest_log_event_id,
+        maintenance=_prune_log_events,
+        poll_interval=app.config['EVENTS_POLL_INTERVAL']
+    ).serve(app.config['EVENTS_HOST'], app.config['EVENTS_PORT'])
+
+
+@app.route('/api/stats', methods=['GET'])
+@login_required
+def get_stats():
+    """发送统计（仅读取预聚合的统计表）"""
+    days = min(max(request.args.get('days', 7, type=int), 1), 90)
+    now = stat_hour(datetime.now(pytz.timezone('Asia/Shanghai')))
+    # 超过两天按天聚合，否则按小时
+    by_day = days > 2
+    if by_day:
+        start = now.replace(hour=0) - timedelta(days=days - 1)
+    else:
+        start = now - timedelta(days=days) + timedelta(hours=1)
+
+    rows = db.session.query(
+        NotificationStat.hour,
+        NotificationStat.status,
+        db.func.sum(NotificationStat.count)
+    ).filter(
+        NotificationStat.user_id == current_user.id,
+        NotificationStat.hour >= start
+    ).group_by(NotificationStat.hour, NotificationStat.status).all()
+
+    timeline = defaultdict(lambda: {'success': 0, 'failed': 0})
+    totals = defaultdict(int)
+    for hour, status, count in rows:
+        bucket = hour.replace(hour=0) if by_day else hour
+        timeline[bucket][status] = timeline[bucket].get(status, 0) + int(count)
+        totals[status] += int(count)
+
+    # 补齐空桶，保证图表时间轴连续
+    step = timedelta(days=1) if by_day else timedelta(hours=1)
+    cursor = start
+    points = []
+    while cursor <= now:
+        points.append(dict(time=cursor.isoformat(), **timeline[cursor]))
+        cursor += step
+
+    # 失败率只统计已完成发送的通知（不含待发送和已取消）
+    failed_sum = db.func.sum(db.case((NotificationStat.status == 'failed', NotificationStat.count), else_=0))
+    total_sum = db.func.sum(db.case(
+        (NotificationStat.status.in_(('success', 'failed')), NotificationStat.count), else_=0))
+    failing = db.session.query(
+        NotificationStat.channel_id,
+        NotificationStat.channel_type,
+        failed_sum.label('failed'),
+        total_sum.label('total')
+    ).filter(
+        NotificationStat.user_id == current_user.id,
+        NotificationStat.hour >= start
+    ).group_by(
+        NotificationStat.channel_id, NotificationStat.channel_type
+    ).having(failed_sum > 0).order_by(failed_sum.desc()).limit(5).all()
+
+    total = totals['success'] + totals['failed']
+    return jsonify({
+        'days': days,
+        'granularity': 'day' if by_day else 'hour',
+        'total': total,
+        'success': totals['success'],
+        'failed': totals['failed'],
+        'success_rate': round(totals['success'] / total, 4) if total else None,
+        'timeline': points,
+        'top_failing_channels': [{
+            'channel_id': row.channel_id,
+            'channel_type': row.channel_type,
+            'failed': int(row.failed),
+            'total': int(row.total),
+            'failure_rate': round(int(row.failed) / int(row.total), 4) if row.total else None
+        } for row in failing]
+    })
 
 
 @app.context_processor
 def inject_now():
-    return {'now': datetime.now()}
+    return {'now': datetime.now(), 'channel_labels': senders.channel_labels()}
 # 数据库初始化通过 flask init-db 命令进行
 
 
 if __name__ == '__main__':
+    # 调试模式下只在重载器启动的子进程中运行调度器
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_up_senders()
+        start_scheduler()
+        start_maintenance()
     app.run(
         host=app.config['SERVER_HOST'],
         port=app.config['SERVER_PORT'],
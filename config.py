@@ -19,6 +19,45 @@ class Config:
     # IP及端口设置
     SERVER_HOST = os.getenv('SERVER_HOST', '127.0.0.1')
     SERVER_PORT = os.getenv('SERVER_PORT', '5000')
+    # 前方可信反向代理的层数，0表示直接对外提供服务，不信任客户端提交的X-Forwarded-*头
+    TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '0'))
 
     # 注册功能开关
-    REGISTRATION_ENABLED = os.getenv('REGISTRATION_ENABLED', 'true').lower() == 'true'
\ No newline at end of file
+    REGISTRATION_ENABLED = os.getenv('REGISTRATION_ENABLED', 'true').lower() == 'true'
+
+    # 定时发送调度器
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    SCHEDULER_WINDOW = int(os.getenv('SCHEDULER_WINDOW', '3600'))  # 内存中预加载的时间窗口（秒）
+    SCHEDULER_LEASE = int(os.getenv('SCHEDULER_LEASE', '300'))  # 发送中任务的租约时长（秒），超时未完成将重新发送
+    SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', '4'))  # 发送定时通知的线程数，慢接口不会阻塞调度线程
+
+    # 合并发送窗口（秒），支持合并的通道（如阿里云短信）在该时间内的请求会合并为一次批量调用，0为关闭
+    SEND_BATCH_WINDOW = float(os.getenv('SEND_BATCH_WINDOW', '0.2'))
+    # 发送中的日志超过该时长（秒）仍未完成时视为worker已退出，标记为失败
+    SEND_PENDING_TIMEOUT = int(os.getenv('SEND_PENDING_TIMEOUT', '600'))
+
+    # 控制台实时日志（SSE）服务，通过 flask serve-events 独立运行
+    EVENTS_HOST = os.getenv('EVENTS_HOST', '0.0.0.0')
+    EVENTS_PORT = int(os.getenv('EVENTS_PORT', '5001'))
+    EVENTS_PUBLIC_URL = os.getenv('EVENTS_PUBLIC_URL', '')  # 经反向代理访问时的完整地址，如 https://example.com/events
+    EVENTS_POLL_INTERVAL = float(os.getenv('EVENTS_POLL_INTERVAL', '1'))
+    EVENTS_RETENTION = int(os.getenv('EVENTS_RETENTION', '3600'))  # 事件保留时长（秒），超出后重连需重新加载
+    EVENTS_TOKEN_MAX_AGE = int(os.getenv('EVENTS_TOKEN_MAX_AGE', '86400'))
+
+    # /api/notify 准入控制（令牌桶，同机worker通过本地SQLite文件共享状态）
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_STORAGE = os.getenv('RATE_LIMIT_STORAGE', '')  # 状态文件路径，默认位于系统临时目录
+    # 各速率为0时不启用对应的桶，默认均不启用，升级后已有调用方不受影响
+    IP_RATE = float(os.getenv('IP_RATE', '0'))  # 每个客户端IP每秒请求数，在校验token之前检查
+    IP_BURST = float(os.getenv('IP_BURST', '100'))
+    TOKEN_RATE = float(os.getenv('TOKEN_RATE', '0'))  # 每个token每秒请求数
+    TOKEN_BURST = float(os.getenv('TOKEN_BURST', '20'))
+    USER_RATE = float(os.getenv('USER_RATE', '0'))  # 每个用户每秒请求数
+    USER_BURST = float(os.getenv('USER_BURST', '40'))
+    # 全局发送容量，按priority预留：normal不能用掉最后CRITICAL_RESERVE比例，bulk不能用掉最后BULK_RESERVE比例
+    SEND_RATE = float(os.getenv('SEND_RATE', '0'))
+    SEND_BURST = float(os.getenv('SEND_BURST', '100'))
+    SEND_CRITICAL_RESERVE = float(os.getenv('SEND_CRITICAL_RESERVE', '0.2'))
+    SEND_BULK_RESERVE = float(os.getenv('SEND_BULK_RESERVE', '0.5'))
+    # 运维查看准入统计的凭证，未设置时不开放 /api/admission
+    OPERATOR_TOKEN = os.getenv('OPERATOR_TOKEN', '')
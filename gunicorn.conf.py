@@ -0,0 +1,9 @@
+# gunicorn 默认读取当前目录下的该文件
+
+
+def post_worker_init(worker):
+    # 每个worker加载应用后立即预热发送器并启动定时发送调度器与定期维护，不必等待第一个请求
+    from app import start_maintenance, start_scheduler, warm_up_senders
+    warm_up_senders()
+    start_scheduler()
+    start_maintenance()
@@ -0,0 +1,165 @@
+"""通道发送器注册表
+
+channel_type 映射到延迟导入的发送器类，只有实际用到的通道才会导入其依赖。
+第三方通道可通过 ``notifyhub.senders`` entry point 注册，名称即通道类型，值为发送器类。
+"""
+import atexit
+import importlib
+import logging
+import threading
+from concurrent.futures import Future
+
+from senders.base import BaseSender
+from senders.batching import BatchCollector
+
+ENTRY_POINT_GROUP = 'notifyhub.senders'
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+_instances = {}
+_lock = threading.Lock()
+_entry_points_loaded = False
+_batchers = {}
+
+
+class _Entry:
+    def __init__(self, target, label):
+        self.target = target
+        self.label = label
+
+    def load(self):
+        target = self.target
+        if isinstance(target, str):
+            module_name, _, attr = target.partition(':')
+            return getattr(importlib.import_module(module_name), attr)
+        if hasattr(target, 'load'):  # importlib.metadata.EntryPoint
+            return target.load()
+        return target
+
+
+def register(channel_type, target, label=None):
+    """注册发送器，target 可以是 'module:Class' 字符串、EntryPoint 或类本身"""
+    if label is None and isinstance(target, type):
+        label = target.label
+    _registry[channel_type] = _Entry(target, label or channel_type)
+
+
+def _load_entry_points():
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    from importlib.metadata import entry_points
+    eps = entry_points()
+    # Python 3.8/3.9 返回按组划分的字典
+    eps = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, 'select') else eps.get(ENTRY_POINT_GROUP, [])
+    for ep in eps:
+        # 内置通道不允许被覆盖
+        if ep.name not in _registry:
+            register(ep.name, ep)
+
+
+def channel_labels():
+    """通道类型到显示名称的映射，不会导入任何发送器模块"""
+    _load_entry_points()
+    return {channel_type: entry.label for channel_type, entry in _registry.items()}
+
+
+def get_sender(channel_type):
+    """获取通道类型对应的发送器实例，未注册时返回None"""
+    sender = _instances.get(channel_type)
+    if sender is not None:
+        return sender
+    _load_entry_points()
+    entry = _registry.get(channel_type)
+    if entry is None:
+        return None
+    with _lock:
+        if channel_type not in _instances:
+            sender_class = entry.load()
+            if not issubclass(sender_class, BaseSender):
+                raise TypeError(f"{channel_type} 的发送器必须继承 BaseSender")
+            _instances[channel_type] = sender_class()
+        return _instances[channel_type]
+
+
+def warm_up(channel_types):
+    """对给定的通道类型创建发送器并调用其warm_up，单个通道失败不影响其他通道"""
+    for channel_type in channel_types:
+        try:
+            sender = get_sender(channel_type)
+            if sender is not None:
+                sender.warm_up()
+        except Exception:
+            logger.exception('发送器预热失败: %s', channel_type)
+
+
+def get_batcher(channel_type, window):
+    """获取通道类型的合并发送收集器，通道不支持合并或window为0时返回None"""
+    sender = get_sender(channel_type)
+    if sender is None or not window or type(sender).batch_key is BaseSender.batch_key:
+        return None
+    with _lock:
+        if channel_type not in _batchers:
+            _batchers[channel_type] = BatchCollector(
+                sender.send_many, window, getattr(sender, 'batch_limit', 100)
+            )
+        return _batchers[channel_type]
+
+
+def send(channel_type, config, content, window=0):
+    """发送单条通知，支持合并的通道在window秒内与其他请求合并发送"""
+    future = submit(channel_type, config, content, window)
+    return future.result()
+
+
+def _batch_target(channel_type, config, window):
+    batcher = get_batcher(channel_type, window)
+    key = get_sender(channel_type).batch_key(config) if batcher else None
+    return (batcher, key) if key is not None else (None, None)
+
+
+def batches(channel_type, config, window):
+    """该通知是否会进入合并发送"""
+    return _batch_target(channel_type, config, window)[0] is not None
+
+
+def submit(channel_type, config, content, window=0, executor=None):
+    """异步发送单条通知，返回Future；不合并的通知在executor中发送，未提供时同步发送"""
+    sender = get_sender(channel_type)
+    if sender is None:
+        raise ValueError('不支持的通道类型')
+    batcher, key = _batch_target(channel_type, config, window)
+    if batcher is not None:
+        return batcher.submit(key, config, content)
+    if executor is not None:
+        return executor.submit(sender.send, config, content)
+
+    future = Future()
+    try:
+        future.set_result(sender.send(config, content))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+@atexit.register
+def close_all():
+    """释放所有已创建发送器持有的资源"""
+    with _lock:
+        for sender in _instances.values():
+            try:
+                sender.close()
+            except Exception:
+                pass
+        _instances.clear()
+
+
+register('smtp', 'senders.smtp:SmtpSender', 'SMTP邮件')
+register('sms', 'senders.sms:SmsSender', '阿里云短信')
+register('tg', 'senders.telegram:TelegramSender', 'Telegram')
+register('dingtalk', 'senders.dingtalk:DingtalkSender', '钉钉')
+register('feishu', 'senders.feishu:FeishuSender', '飞书')
+register('wechat', 'senders.wechat:WechatSender', '企业微信')
+register('webhook', 'senders.webhook:WebhookSender', 'webhook')
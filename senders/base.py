@@ -0,0 +1,78 @@
+import threading
+
+
+class BaseSender:
+    """通道发送器基类，每个通道类型在进程内只实例化一次"""
+    # 在通道类型选择框中显示的名称
+    label = None
+
+    def validate_config(self, config):
+        """校验通道配置，不合法时抛出ValueError"""
+
+    def batch_key(self, config):
+        """可合并发送的分组键，返回None表示该通道不合并发送"""
+        return None
+
+    def warm_up(self):
+        """预先导入依赖等准备工作，worker启动时对已配置的通道类型调用一次"""
+
+    def send(self, config, content):
+        raise NotImplementedError
+
+    def send_many(self, config, contents):
+        """批量发送，返回与contents一一对应的异常（成功为None）
+
+        默认逐条调用send，支持批量接口的通道可重写此方法。
+        """
+        results = []
+        for content in contents:
+            try:
+                self.send(config, content)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def close(self):
+        """释放连接池等资源"""
+
+
+def require_fields(config, fields):
+    missing = [field for field in fields if not config.get(field)]
+    if missing:
+        raise ValueError(f"配置缺少必要字段: {', '.join(missing)}")
+
+
+class HttpSender(BaseSender):
+    """基于requests的发送器，每个线程复用各自的Session以保持连接
+
+    requests.Session 不保证线程安全，请求线程、调度线程与合并发送线程各用一个。
+    """
+    # 请求超时（秒），避免无响应的接口一直占用发送线程
+    timeout = 10
+
+    def __init__(self):
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+
+    @property
+    def session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            session = self._local.session = requests.Session()
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def warm_up(self):
+        # 导入requests较慢，避免落在第一个请求上
+        import requests
+
+    def close(self):
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
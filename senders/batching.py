@@ -0,0 +1,61 @@
+import threading
+import time
+from concurrent.futures import Future
+
+
+class BatchCollector:
+    """在短时间窗口内收集同一分组的发送请求，到期或达到上限后一次性交给 flush 处理
+
+    flush(config, contents) 需返回与 contents 一一对应的异常列表（成功为None）。
+    单个后台线程负责所有分组，submit 返回的 Future 在该批发送完成后得到结果。
+    """
+
+    def __init__(self, flush, window, max_size=100):
+        self._flush = flush
+        self._window = window
+        self._max_size = max_size
+        self._groups = {}  # key -> [deadline, config, [(content, future)]]
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def submit(self, key, config, content):
+        future = Future()
+        with self._condition:
+            self._ensure_thread()
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = [time.monotonic() + self._window, config, []]
+            group[2].append((content, future))
+            if len(group[2]) >= self._max_size:
+                group[0] = 0
+            self._condition.notify()
+        return future
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='batch-collector', daemon=True)
+            self._thread.start()
+
+    def _take_due(self):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                due = [key for key, group in self._groups.items() if group[0] <= now]
+                if due:
+                    return [self._groups.pop(key) for key in due]
+                timeout = min((group[0] for group in self._groups.values()), default=None)
+                self._condition.wait(None if timeout is None else timeout - now)
+
+    def _run(self):
+        while True:
+            for _, config, items in self._take_due():
+                contents = [content for content, _ in items]
+                try:
+                    results = self._flush(config, contents)
+                except Exception as e:
+                    results = [e] * len(items)
+                for (_, future), error in zip(items, results):
+                    if error is None:
+                        future.set_result(True)
+                    else:
+                        future.set_exception(error)
@@ -0,0 +1,66 @@
+import base64
+import hashlib
+import hmac
+import time
+import urllib.parse
+
+from senders.base import HttpSender, require_fields
+
+
+def generate_sign(secret, timestamp):
+    """生成钉钉加签签名"""
+    string_to_sign = f"{timestamp}\n{secret}"
+    hmac_code = hmac.new(
+        secret.encode('utf-8'),
+        string_to_sign.encode('utf-8'),
+        hashlib.sha256
+    ).digest()
+    return urllib.parse.quote_plus(base64.b64encode(hmac_code))
+
+
+class DingtalkSender(HttpSender):
+    """发送钉钉通知（支持加签验证）"""
+    label = '钉钉'
+
+    def validate_config(self, config):
+        require_fields(config, ['webhook_url'])
+
+    def send(self, config, content):
+        try:
+            webhook_url = config['webhook_url']
+            secret = config.get('secret')
+
+            if config.get('msg_type', 'text') == 'text':
+                payload = {
+                    "msgtype": "text",
+                    "text": {
+                        "content": content
+                    }
+                }
+            else:  # markdown
+                payload = {
+                    "msgtype": "markdown",
+                    "markdown": {
+                        "title": config.get('title', '通知'),
+                        "text": content
+                    }
+                }
+
+            if config.get('at_mobiles'):
+                payload["at"] = {
+                    "atMobiles": config['at_mobiles'],
+                    "isAtAll": False
+                }
+
+            if secret:
+                timestamp = str(round(time.time() * 1000))
+                sign = generate_sign(secret, timestamp)
+                webhook_url = f"{webhook_url}&timestamp={timestamp}&sign={sign}"
+
+            response = self.session.post(webhook_url, json=payload, timeout=self.timeout)
+            result = response.json()
+            if result.get('errcode') != 0:
+                raise Exception(f"钉钉发送失败: {result.get('errmsg')}")
+            return True
+        except Exception as e:
+            raise Exception(f"钉钉发送失败: {str(e)}")
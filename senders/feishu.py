@@ -0,0 +1,29 @@
+from senders.base import HttpSender, require_fields
+
+
+class FeishuSender(HttpSender):
+    """发送飞书通知"""
+    label = '飞书'
+
+    def validate_config(self, config):
+        require_fields(config, ['webhook_url'])
+
+    def send(self, config, content):
+        try:
+            webhook_url = config['webhook_url']
+
+            payload = {
+                "msg_type": "text",
+                "content": {
+                    "text": content
+                }
+            }
+
+            response = self.session.post(webhook_url, json=payload, timeout=self.timeout)
+            result = response.json()
+
+            if result.get('code') != 0:
+                raise Exception(f"飞书发送失败: {result.get('msg')}")
+            return True
+        except Exception as e:
+            raise Exception(f"飞书发送失败: {str(e)}")
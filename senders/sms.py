@@ -0,0 +1,197 @@
+import hashlib
+import json
+
+from senders.base import BaseSender, require_fields
+
+
+class SmsSender(BaseSender):
+    """发送阿里云短信通知（支持字典或JSON字符串输入）"""
+    label = '阿里云短信'
+    required_fields = ['phone_numbers', 'sign_name', 'template_code']
+    # SendBatchSms单次调用的号码上限
+    batch_limit = 100
+    # 由个别号码或参数引起的批量拒绝，逐条重发可以让其余通知发送成功；限流、额度等错误整批失败
+    item_error_codes = frozenset([
+        'isv.MOBILE_NUMBER_ILLEGAL',
+        'isv.BLACK_KEY_CONTROL_LIMIT',
+        'isv.PARAM_LENGTH_LIMIT',
+        'isv.TEMPLATE_PARAMS_ILLEGAL',
+        'isv.INVALID_JSON_PARAM',
+    ])
+
+    def batch_key(self, config):
+        """相同AK/SK的短信可以合并发送"""
+        credentials = f"{config.get('access_key_id')}:{config.get('access_key_secret')}"
+        return hashlib.sha256(credentials.encode('utf-8')).hexdigest()
+
+    def validate_config(self, config):
+        require_fields(config, ['access_key_id', 'access_key_secret'])
+
+    def parse_content(self, content):
+        # 处理content（支持字典或JSON字符串）
+        if isinstance(content, str):
+            try:
+                content = json.loads(content)
+            except json.JSONDecodeError:
+                raise ValueError("content必须是字典或合法JSON字符串")
+        if not isinstance(content, dict):
+            raise ValueError("content必须是字典或JSON字符串")
+
+        # 检查必要参数
+        for field in self.required_fields:
+            if field not in content:
+                raise ValueError(f"content缺少必要参数: {field}")
+        return content
+
+    def template_vars(self, content):
+        """提取模板变量（排除系统参数）"""
+        return {
+            k: str(v) for k, v in content.items()
+            if k not in self.required_fields
+        }
+
+    def warm_up(self):
+        # 阿里云SDK导入耗时较长，提前在worker启动时完成
+        import alibabacloud_dysmsapi20170525.client
+        import alibabacloud_dysmsapi20170525.models
+        import alibabacloud_tea_openapi.models
+        import alibabacloud_tea_util.models
+
+    def create_client(self, config):
+        from alibabacloud_dysmsapi20170525.client import Client as DysmsapiClient
+        from alibabacloud_tea_openapi import models as open_api_models
+
+        # 检查config是否包含AK/SK
+        if 'access_key_id' not in config or 'access_key_secret' not in config:
+            raise ValueError("config必须包含access_key_id和access_key_secret")
+
+        api_config = open_api_models.Config(
+            access_key_id=config['access_key_id'],
+            access_key_secret=config['access_key_secret']
+        )
+        api_config.endpoint = 'dysmsapi.aliyuncs.com'
+        return DysmsapiClient(api_config)
+
+    def send(self, config, content):
+        try:
+            from alibabacloud_dysmsapi20170525 import models as dysmsapi_models
+            from alibabacloud_tea_util import models as util_models
+
+            client = self.create_client(config)
+            content = self.parse_content(content)
+
+            send_sms_request = dysmsapi_models.SendSmsRequest(
+                phone_numbers=content['phone_numbers'],
+                sign_name=content['sign_name'],
+                template_code=content['template_code'],
+                template_param=json.dumps(self.template_vars(content), separators=(',', ':'))
+            )
+
+            response = client.send_sms_with_options(
+                send_sms_request,
+                util_models.RuntimeOptions()
+            )
+
+            if response.body.code != 'OK':
+                raise Exception(f"短信发送失败: {response.body.message}")
+            return True
+
+        except Exception as e:
+            raise Exception(f"短信发送失败: {str(e)}")
+
+    def send_many(self, config, contents):
+        """按签名和模板分组，通过SendBatchSms合并发送
+
+        SendBatchSms只返回整批的结果，因个别号码或参数被拒绝时（如某个号码不合法）
+        逐条重发以得到每条通知各自的结果；限流、额度不足、网络异常等情况整批记为失败，
+        不再逐条重发放大调用量。
+        """
+        results = [None] * len(contents)
+        groups = {}
+        for index, content in enumerate(contents):
+            try:
+                content = self.parse_content(content)
+                phones = [phone.strip() for phone in str(content['phone_numbers']).split(',') if phone.strip()]
+                if not phones:
+                    raise ValueError("content缺少必要参数: phone_numbers")
+            except Exception as e:
+                results[index] = Exception(f"短信发送失败: {str(e)}")
+                continue
+            if len(phones) > self.batch_limit:
+                # 号码过多的单条通知直接走SendSms
+                try:
+                    self.send(config, content)
+                except Exception as e:
+                    results[index] = e
+                continue
+            key = (content['sign_name'], content['template_code'])
+            groups.setdefault(key, []).append((index, content, phones))
+
+        if not groups:
+            return results
+
+        try:
+            client = self.create_client(config)
+        except Exception as e:
+            for items in groups.values():
+                for index, _, _ in items:
+                    results[index] = Exception(f"短信发送失败: {str(e)}")
+            return results
+
+        for (sign_name, template_code), items in groups.items():
+            batch = []
+            count = 0
+            for item in items:
+                if batch and count + len(item[2]) > self.batch_limit:
+                    self._send_batch(client, config, sign_name, template_code, batch, results)
+                    batch, count = [], 0
+                batch.append(item)
+                count += len(item[2])
+            self._send_batch(client, config, sign_name, template_code, batch, results)
+        return results
+
+    def _send_batch(self, client, config, sign_name, template_code, batch, results):
+        from alibabacloud_dysmsapi20170525 import models as dysmsapi_models
+        from alibabacloud_tea_util import models as util_models
+
+        if len(batch) == 1:
+            index, content, _ = batch[0]
+            try:
+                self.send(config, content)
+            except Exception as e:
+                results[index] = e
+            return
+
+        phone_numbers, template_params = [], []
+        for _, content, phones in batch:
+            template_vars = self.template_vars(content)
+            for phone in phones:
+                phone_numbers.append(phone)
+                template_params.append(template_vars)
+
+        send_batch_request = dysmsapi_models.SendBatchSmsRequest(
+            phone_number_json=json.dumps(phone_numbers),
+            sign_name_json=json.dumps([sign_name] * len(phone_numbers), ensure_ascii=False),
+            template_code=template_code,
+            template_param_json=json.dumps(template_params, ensure_ascii=False, separators=(',', ':'))
+        )
+        try:
+            response = client.send_batch_sms_with_options(
+                send_batch_request,
+                util_models.RuntimeOptions()
+            )
+        except Exception as e:
+            for index, _, _ in batch:
+                results[index] = Exception(f"短信发送失败: {str(e)}")
+            return
+
+        if response.body.code in self.item_error_codes:
+            # 整批被拒绝时没有号码被发送，逐条重发定位失败的通知
+            for index, content, _ in batch:
+                try:
+                    self.send(config, content)
+                except Exception as e:
+                    results[index] = e
+        elif response.body.code != 'OK':
+            for index, _, _ in batch:
+                results[index] = Exception(f"短信发送失败: {response.body.message}")
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import smtplib
+from email.mime.text import MIMEText
+from email.utils import formataddr
+
+import idna
+
+from senders.base import BaseSender, require_fields
+
+
+def format_email_address(display_name, email_address):
+    """标准化邮箱地址格式"""
+    try:
+        # 处理国际化域名（如 公司.中国 -> xn--fiq228c.xn--fiqs8s）
+        local_part, domain = email_address.split('@')
+        domain_ascii = idna.encode(domain).decode('ascii')
+        email_ascii = f"{local_part}@{domain_ascii}"
+
+        # 返回格式化后的地址
+        if display_name:
+            return formataddr((display_name, email_ascii))
+        return email_ascii
+    except Exception as e:
+        raise ValueError(f"邮箱地址格式错误: {str(e)}")
+
+
+class SmtpSender(BaseSender):
+    """发送邮件通知（支持国际化地址和完整发件人格式）"""
+    label = 'SMTP邮件'
+
+    def validate_config(self, config):
+        require_fields(config, ['smtp_server', 'smtp_username', 'smtp_password'])
+
+    def batch_key(self, config):
+        """同一服务器和账号的邮件可以复用一次登录"""
+        account = ':'.join(str(config.get(field)) for field in
+                           ('smtp_server', 'smtp_port', 'use_ssl', 'smtp_username', 'smtp_password'))
+        return hashlib.sha256(account.encode('utf-8')).hexdigest()
+
+    def build_message(self, config, content):
+        # 1. 内容解析与校验
+        if isinstance(content, str):
+            try:
+                content = json.loads(content)
+            except json.JSONDecodeError:
+                content = {"text_body": content}
+
+        required_fields = ['to_email', 'subject', 'text_body']
+        for field in required_fields:
+            if field not in content:
+                raise ValueError(f"缺少必要字段: {field}")
+
+        # 2. 构建邮件消息
+        msg = MIMEText(content['text_body'], 'html', 'utf-8')
+        msg['Subject'] = content['subject']
+
+        # 发件人处理（显示名 + 配置中的邮箱）
+        from_name = content.get('from_name', '').strip()
+        msg['From'] = format_email_address(
+            from_name,
+            config['smtp_username']
+        )
+
+        # 收件人处理（支持多个收件人，用逗号分隔）
+        to_emails = [e.strip() for e in content['to_email'].split(',')]
+        msg['To'] = ', '.join(
+            format_email_address(None, email) for email in to_emails
+        )
+        return msg
+
+    def connect(self, config):
+        """邮件服务器连接（自动选择加密方式）"""
+        port = config.get('smtp_port', 465)
+        if config.get('use_ssl') or port == 465:
+            server = smtplib.SMTP_SSL(config['smtp_server'], port, timeout=10)
+        else:
+            server = smtplib.SMTP(config['smtp_server'], port, timeout=10)
+            try:
+                server.starttls()
+            except smtplib.SMTPNotSupportedError:
+                pass
+        server.login(config['smtp_username'], config['smtp_password'])
+        return server
+
+    def send(self, config, content):
+        try:
+            msg = self.build_message(config, content)
+            server = self.connect(config)
+            server.send_message(msg)
+            server.quit()
+            return True
+        except Exception as e:
+            raise Exception(f"邮件发送失败: {str(e)}")
+
+    def send_many(self, config, contents):
+        """同一通道的多封邮件复用一次SMTP登录"""
+        results = []
+        server = None
+        try:
+            for content in contents:
+                try:
+                    msg = self.build_message(config, content)
+                    if server is None:
+                        server = self.connect(config)
+                    server.send_message(msg)
+                    results.append(None)
+                except Exception as e:
+                    results.append(Exception(f"邮件发送失败: {str(e)}"))
+        finally:
+            if server is not None:
+                try:
+                    server.quit()
+                except smtplib.SMTPException:
+                    pass
+        return results
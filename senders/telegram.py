@@ -0,0 +1,54 @@
+import requests
+
+from senders.base import HttpSender, require_fields
+
+
+class TelegramSender(HttpSender):
+    """发送Telegram通知"""
+    label = 'Telegram'
+
+    def validate_config(self, config):
+        require_fields(config, ['api_url', 'bot_token', 'chat_id'])
+        if config.get('is_proxy', False) and 'https_proxy' not in config:
+            raise ValueError("启用代理但未配置https_proxy")
+
+    def send(self, config, content):
+        try:
+            # 确保api_url没有结尾斜杠
+            api_url = config['api_url'].rstrip('/')
+            url = f"{api_url}/bot{config['bot_token']}/sendMessage"
+
+            payload = {
+                'chat_id': config['chat_id'],
+                'text': content,
+                'parse_mode': 'HTML'
+            }
+
+            # 根据is_proxy决定是否使用代理
+            proxies = None
+            if config.get('is_proxy', False):
+                if 'https_proxy' not in config:
+                    raise ValueError("启用代理但未配置https_proxy")
+                proxies = {
+                    'https': config['https_proxy']
+                }
+
+            # 发送请求
+            response = self.session.post(
+                url,
+                data=payload,
+                proxies=proxies,  # 自动处理None情况
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+
+            # 检查Telegram返回的错误
+            result = response.json()
+            if not result.get('ok'):
+                raise Exception(f"Telegram API错误: {result.get('description')}")
+
+            return True
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"网络请求失败: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Telegram发送失败: {str(e)}")
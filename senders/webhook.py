@@ -0,0 +1,29 @@
+import json
+
+from senders.base import HttpSender, require_fields
+
+
+class WebhookSender(HttpSender):
+    """发送webhook通知"""
+    label = 'webhook'
+
+    def validate_config(self, config):
+        require_fields(config, ['webhook_url'])
+
+    def send(self, config, content):
+        try:
+            webhook_url = config['webhook_url']
+
+            try:
+                payload = json.loads(content)
+            except json.JSONDecodeError:
+                raise Exception(f"提交JSON格式错误")
+            response = self.session.post(webhook_url, json=payload, timeout=self.timeout)
+            result = response.json()
+
+            if result.get('code') != 200:
+                raise Exception(f"webhook发送失败: {result.get('msg')}，以返回的code及msg作为发送成功与否的标准")
+            return True
+
+        except Exception as e:
+            raise Exception(f"webhook发送失败: {str(e)}，以返回的code及msg作为发送成功与否的标准")
@@ -0,0 +1,37 @@
+from senders.base import HttpSender, require_fields
+
+
+class WechatSender(HttpSender):
+    """发送企业微信通知"""
+    label = '企业微信'
+
+    def validate_config(self, config):
+        require_fields(config, ['webhook_url'])
+
+    def send(self, config, content):
+        try:
+            webhook_url = config['webhook_url']
+
+            if config.get('msg_type', 'text') == 'text':
+                payload = {
+                    "msgtype": "text",
+                    "text": {
+                        "content": content
+                    }
+                }
+            else:  # markdown
+                payload = {
+                    "msgtype": "markdown",
+                    "markdown": {
+                        "content": content
+                    }
+                }
+
+            response = self.session.post(webhook_url, json=payload, timeout=self.timeout)
+            result = response.json()
+
+            if result.get('errcode') != 0:
+                raise Exception(f"钉钉发送失败: {result.get('errmsg')}")
+            return True
+        except Exception as e:
+            raise Exception(f"钉钉发送失败: {str(e)}")
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+class Bucket:
+    """令牌桶参数：每秒补充rate个、容量burst；本次取用后剩余不得低于floor"""
+
+    def __init__(self, key, rate, burst, floor=0, cost=1):
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+        self.floor = floor
+        self.cost = cost
+
+
+def token_key(token):
+    """不保存原始token，只用其摘要作为限流键"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+
+
+class SqliteBucketStore:
+    """基于本机SQLite文件的令牌桶存储，同一台机器上的所有gunicorn worker共享
+
+    状态可随时丢弃，使用WAL并关闭同步以降低每次请求的开销。
+    """
+    COUNTER_WINDOW = 60
+    IDLE_TTL = 3600
+
+    def __init__(self, path=None):
+        self._path = path or os.path.join(tempfile.gettempdir(), 'notifyhub-ratelimit.db')
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute('CREATE TABLE IF NOT EXISTS buckets ('
+                               'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            connection.execute('CREATE TABLE IF NOT EXISTS counters ('
+                               'key TEXT PRIMARY KEY, user_id INTEGER, accepted INTEGER NOT NULL DEFAULT 0, '
+                               'rejected INTEGER NOT NULL DEFAULT 0, window_start REAL NOT NULL, '
+                               'window_accepted INTEGER NOT NULL DEFAULT 0, window_rejected INTEGER NOT NULL DEFAULT 0, '
+                               'prev_accepted INTEGER NOT NULL DEFAULT 0, prev_rejected INTEGER NOT NULL DEFAULT 0, '
+                               'last_seen REAL NOT NULL)')
+            self._local.connection = connection
+        return connection
+
+    def acquire(self, buckets, now=None):
+        """原子地从所有桶中取用令牌；全部满足时返回0，否则不取用并返回需等待的秒数"""
+        now = time.time() if now is None else now
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            levels = []
+            retry_after = 0
+            for bucket in buckets:
+                row = connection.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (bucket.key,)).fetchone()
+                tokens = bucket.burst if row is None else min(bucket.burst, row[0] + (now - row[1]) * bucket.rate)
+                shortfall = bucket.floor + bucket.cost - tokens
+                if shortfall > 0:
+                    retry_after = max(retry_after, shortfall / bucket.rate if bucket.rate else float('inf'))
+                levels.append(tokens - bucket.cost)
+            if not retry_after:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                    [(bucket.key, level, now) for bucket, level in zip(buckets, levels)]
+                )
+            if random.random() < 0.001:
+                self._prune(connection, now)
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return retry_after
+
+    def record(self, key, accepted, user_id=None, now=None):
+        """累计准入/拒绝次数，按分钟窗口估算实时速率"""
+        now = time.time() if now is None else now
+        window_start = now - now % self.COUNTER_WINDOW
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute('SELECT window_start, window_accepted, window_rejected FROM counters WHERE key = ?',
+                                     (key,)).fetchone()
+            if row is None:
+                connection.execute('INSERT INTO counters (key, window_start, last_seen) VALUES (?, ?, ?)',
+                                   (key, window_start, now))
+            elif row[0] < window_start:
+                # 进入新窗口，上一窗口的计数用于速率估算
+                previous = row[1:] if row[0] == window_start - self.COUNTER_WINDOW else (0, 0)
+                connection.execute('UPDATE counters SET window_start = ?, prev_accepted = ?, prev_rejected = ?, '
+                                   'window_accepted = 0, window_rejected = 0 WHERE key = ?',
+                                   (window_start, previous[0], previous[1], key))
+            field = 'accepted' if accepted else 'rejected'
+            connection.execute(f'UPDATE counters SET {field} = {field} + 1, window_{field} = window_{field} + 1, '
+                               'user_id = COALESCE(?, user_id), last_seen = ? WHERE key = ?',
+                               (user_id, now, key))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    def snapshot(self, now=None):
+        """各限流键的累计次数与最近一分钟的速率（次/分钟）"""
+        now = time.time() if now is None else now
+        window_start = now - now % self.COUNTER_WINDOW
+        weight = 1 - (now - window_start) / self.COUNTER_WINDOW
+        rows = self._connection().execute(
+            'SELECT c.key, c.user_id, c.accepted, c.rejected, c.window_start, c.window_accepted, c.window_rejected, '
+            'c.prev_accepted, c.prev_rejected, c.last_seen, b.tokens, b.updated '
+            'FROM counters c LEFT JOIN buckets b ON b.key = '
+            'CASE WHEN c.key LIKE \'ip:%\' THEN c.key ELSE \'token:\' || c.key END ORDER BY c.last_seen DESC'
+        ).fetchall()
+        result = []
+        for (key, user_id, accepted, rejected, start, window_accepted, window_rejected,
+             prev_accepted, prev_rejected, last_seen, tokens, updated) in rows:
+            if start < window_start:
+                # 窗口已过期，当前窗口计数为0
+                if start == window_start - self.COUNTER_WINDOW:
+                    prev_accepted, prev_rejected = window_accepted, window_rejected
+                else:
+                    prev_accepted = prev_rejected = 0
+                window_accepted = window_rejected = 0
+            result.append({
+                'key': key,
+                'user_id': user_id,
+                'accepted': accepted,
+                'rejected': rejected,
+                'accepted_per_minute': round(window_accepted + prev_accepted * weight, 2),
+                'rejected_per_minute': round(window_rejected + prev_rejected * weight, 2),
+                'tokens': None if tokens is None else round(tokens, 2),
+                'last_seen': last_seen
+            })
+        return result
+
+    def _prune(self, connection, now):
+        # 清理长时间未使用的键，防止随机token撑大存储
+        cutoff = now - self.IDLE_TTL
+        connection.execute('DELETE FROM buckets WHERE updated < ?', (cutoff,))
+        connection.execute('DELETE FROM counters WHERE last_seen < ?', (cutoff,))
@@ -0,0 +1,36 @@
+import base64
+import json
+import zlib
+
+
+class RequestDataCodec:
+    # 压缩格式标记，未带标记的视为旧版明文JSON
+    MARKER = 'z1:'
+    # 不落库的敏感字段
+    SECRET_FIELDS = ('token',)
+    PREVIEW_LENGTH = 100
+
+    @staticmethod
+    def sanitize(data):
+        """去掉敏感字段后序列化为紧凑JSON"""
+        if isinstance(data, dict):
+            data = {k: v for k, v in data.items() if k not in RequestDataCodec.SECRET_FIELDS}
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def compress(text):
+        packed = RequestDataCodec.MARKER + base64.b64encode(zlib.compress(text.encode('utf-8'), 9)).decode()
+        # 短内容压缩后反而更长时保留明文
+        return packed if len(packed) < len(text) else text
+
+    @staticmethod
+    def decompress(stored):
+        if stored and stored.startswith(RequestDataCodec.MARKER):
+            return zlib.decompress(base64.b64decode(stored[len(RequestDataCodec.MARKER):])).decode('utf-8')
+        return stored
+
+    @staticmethod
+    def preview(text):
+        if len(text) <= RequestDataCodec.PREVIEW_LENGTH:
+            return text
+        return text[:RequestDataCodec.PREVIEW_LENGTH - 1] + '…'
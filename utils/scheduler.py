@@ -0,0 +1,103 @@
+import heapq
+import logging
+import threading
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class TimerScheduler:
+    """基于最小堆的定时调度器
+
+    单个后台线程只在堆顶任务到期时醒来，不为每个任务创建定时器，也不轮询数据表。
+    内存中只保留 window 时间窗口内到期的任务，窗口用完后通过 load 回调按到期时间
+    范围查询补充下一段。同一个key可以被重复加入（如重新计划），是否真正执行由
+    dispatch 回调自行判断。
+    """
+
+    def __init__(self, dispatch, load, now, window=timedelta(hours=1)):
+        self._dispatch = dispatch  # dispatch(key)
+        self._load = load  # load(start, end) -> [(due, key), ...]，start为None时包含所有已过期任务
+        self._now = now
+        self._window = window
+        self._heap = []
+        self._horizon = None
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._condition:
+            if self.running:
+                return
+            self._stopped = False
+            self._horizon = None
+            self._heap = []
+            self._thread = threading.Thread(target=self._run, name='notify-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def schedule(self, key, due):
+        """加入任务；窗口之外的任务留待补充窗口时从存储中加载"""
+        with self._condition:
+            if self._horizon is None or due >= self._horizon:
+                return
+            heapq.heappush(self._heap, (due, key))
+            if self._heap[0][1] == key:
+                self._condition.notify()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _refill(self):
+        # 先推进窗口再查询：查询期间新加入的任务直接入堆，可能与查询结果重复，由dispatch去重
+        with self._condition:
+            start = self._horizon
+            end = self._now() + self._window
+            self._horizon = end
+        try:
+            items = self._load(start, end)
+        except Exception:
+            with self._condition:
+                self._horizon = start
+            raise
+        with self._condition:
+            for item in items:
+                heapq.heappush(self._heap, item)
+
+    def _next_due(self):
+        """等待直到有任务到期或需要补充窗口，返回到期任务的key"""
+        with self._condition:
+            while not self._stopped:
+                current = self._now()
+                if current >= self._horizon:
+                    return None
+                if self._heap and self._heap[0][0] <= current:
+                    return heapq.heappop(self._heap)[1]
+                wake_at = min(self._heap[0][0], self._horizon) if self._heap else self._horizon
+                self._condition.wait((wake_at - current).total_seconds())
+        return None
+
+    def _run(self):
+        while not self._stopped:
+            try:
+                if self._horizon is None or self._now() >= self._horizon:
+                    self._refill()
+                key = self._next_due()
+                if key is not None:
+                    self._dispatch(key)
+            except Exception:
+                logger.exception('定时任务调度失败')
+                # 存储暂时不可用时避免空转
+                with self._condition:
+                    self._condition.wait(5)
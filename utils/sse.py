@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import urllib.parse
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class SseServer:
+    """基于asyncio的轻量SSE服务
+
+    单个事件循环承载所有浏览器连接，不占用Web worker。后台只有一个轮询任务按事件id
+    增量读取新事件，再按用户分发给各连接；断线重连时根据 Last-Event-ID 补发。
+    事件id按分配顺序而非提交顺序可见（PostgreSQL/MySQL并发事务），因此每次轮询都会
+    重读游标之前 lookback 个id，已推送过的事件按id去重。
+
+    回调均为同步函数，在线程池中执行：
+    authenticate(token) -> user_id或None
+    fetch_since(last_id, limit) -> [(event_id, user_id, payload), ...]，按event_id升序
+    fetch_for_user(user_id, last_id, limit) -> [(event_id, user_id, payload), ...]
+    latest_id() -> 当前最大事件id
+    oldest_id() -> 当前保留的最小事件id，早于它的事件已被清理，可选
+    maintenance() -> 定期执行的清理工作，可选
+    """
+
+    def __init__(self, authenticate, fetch_since, fetch_for_user, latest_id, oldest_id=None, maintenance=None,
+                 poll_interval=1.0, heartbeat=15, replay_limit=500, queue_size=1000, maintenance_interval=300,
+                 lookback=100):
+        self._authenticate = authenticate
+        self._fetch_since = fetch_since
+        self._fetch_for_user = fetch_for_user
+        self._latest_id = latest_id
+        self._oldest_id = oldest_id
+        self._maintenance = maintenance
+        self._poll_interval = poll_interval
+        self._heartbeat = heartbeat
+        self._replay_limit = replay_limit
+        self._queue_size = queue_size
+        self._maintenance_interval = maintenance_interval
+        self._lookback = lookback
+        self._subscribers = defaultdict(set)
+        self._cursor = 0
+        # 不大于floor的事件不再推送，sent记录回看窗口内已推送的id
+        self._floor = 0
+        self._sent = set()
+
+    def serve(self, host, port):
+        asyncio.run(self._main(host, port))
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _main(self, host, port):
+        self._cursor = self._floor = await self._call(self._latest_id) or 0
+        server = await asyncio.start_server(self._handle, host, port)
+        logger.info('SSE服务已启动: %s:%s', host, port)
+        tasks = [asyncio.create_task(self._poll())]
+        if self._maintenance:
+            tasks.append(asyncio.create_task(self._maintain()))
+        async with server:
+            await asyncio.gather(server.serve_forever(), *tasks)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            try:
+                if not self._subscribers:
+                    # 无人订阅时只推进游标
+                    self._cursor = self._floor = max(self._cursor, await self._call(self._latest_id) or 0)
+                    self._sent.clear()
+                    continue
+                events = await self._call(self._fetch_since, max(self._floor, self._cursor - self._lookback), 1000)
+                for event in events:
+                    if event[0] in self._sent:
+                        continue
+                    self._sent.add(event[0])
+                    self._cursor = max(self._cursor, event[0])
+                    for queue in list(self._subscribers.get(event[1], ())):
+                        try:
+                            queue.put_nowait(event)
+                        except asyncio.QueueFull:
+                            # 消费过慢的连接通知其重新加载
+                            while not queue.empty():
+                                queue.get_nowait()
+                            queue.put_nowait(None)
+                self._floor = max(self._floor, self._cursor - self._lookback)
+                self._sent = {event_id for event_id in self._sent if event_id > self._floor}
+            except Exception:
+                logger.exception('读取事件失败')
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(self._maintenance_interval)
+            try:
+                await self._call(self._maintenance)
+            except Exception:
+                logger.exception('清理事件失败')
+
+    @staticmethod
+    def _format(event_id, event, data):
+        return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        return method, target, headers
+
+    async def _respond(self, writer, status, body):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; charset=utf-8\r\n"
+                     f"Access-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n{body}".encode('utf-8'))
+        await writer.drain()
+        writer.close()
+
+    async def _handle(self, reader, writer):
+        try:
+            method, target, headers = await asyncio.wait_for(self._read_request(reader), 10)
+        except (asyncio.TimeoutError, ValueError, ConnectionError):
+            writer.close()
+            return
+
+        url = urllib.parse.urlsplit(target)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        if method != 'GET' or url.path != '/events':
+            await self._respond(writer, '404 Not Found', 'not found')
+            return
+        user_id = await self._call(self._authenticate, params.get('token', ''))
+        if user_id is None:
+            await self._respond(writer, '401 Unauthorized', 'invalid token')
+            return
+
+        # 断线重连时浏览器自动携带Last-Event-ID，首次连接可通过last_id参数指定
+        last_id = headers.get('last-event-id') or params.get('last_id')
+        try:
+            last_id = int(last_id) if last_id else None
+        except ValueError:
+            last_id = None
+
+        queue = asyncio.Queue(self._queue_size)
+        self._subscribers[user_id].add(queue)
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                         b"Access-Control-Allow-Origin: *\r\nX-Accel-Buffering: no\r\nConnection: keep-alive\r\n\r\n"
+                         b"retry: 3000\n\n")
+            last_sent = self._cursor
+            replayed = set()
+            if last_id is not None:
+                oldest = await self._call(self._oldest_id) if self._oldest_id else None
+                if oldest is None:
+                    oldest = last_sent + 1
+                missed = await self._call(self._fetch_for_user, user_id, last_id, self._replay_limit + 1)
+                if len(missed) > self._replay_limit or (last_id < last_sent and last_id < oldest - 1):
+                    # 缺失过多或中间的事件已被清理，通知客户端重新加载
+                    writer.write(self._format(last_sent, 'reset', {}))
+                else:
+                    for event_id, _, payload in missed:
+                        writer.write(self._format(event_id, 'log', payload))
+                        replayed.add(event_id)
+                    last_sent = max([last_sent] + list(replayed))
+            writer.write(self._format(last_sent, 'ready', {}))
+            await writer.drain()
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), self._heartbeat)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+                    await writer.drain()
+                    continue
+                if event is None:
+                    writer.write(self._format(self._cursor, 'reset', {}))
+                    await writer.drain()
+                    break
+                if event[0] in replayed:
+                    continue
+                # 迟到的事件沿用已发送的最大id，保证客户端的Last-Event-ID不回退
+                last_sent = max(last_sent, event[0])
+                writer.write(self._format(last_sent, 'log', event[2]))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._subscribers[user_id].discard(queue)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+            writer.close()